@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Measures the throughput of the read ahead (--prefetch) for different depths on a simulated
+slow file system. The first access to every file is delayed by the given latency, later
+accesses are served from the "page cache" like on an NFS or SMB mount.
+
+Example:
+'python3 benchmarks/prefetch.py --latency 50 --files 40 --depths 0 1 2 4 8'
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from metadump import Prefetcher
+
+
+class SlowFileSystem:
+    """
+    Stand-in for high-latency storage: the first open of a file takes latency seconds,
+    concurrent opens of the same file wait for the first one to finish.
+    """
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.cached_files = dict()
+
+    def open(self, path_to_file, mode='rb'):
+        with self.lock:
+            loaded = self.cached_files.get(path_to_file)
+            is_first_access = loaded is None
+            if is_first_access:
+                loaded = threading.Event()
+                self.cached_files[path_to_file] = loaded
+        if is_first_access:
+            time.sleep(self.latency)
+            loaded.set()
+        else:
+            loaded.wait()
+        return open(path_to_file, mode=mode)
+
+
+def __measure(file_paths: list, depth: int, latency: float, processing_time: float):
+    file_system = SlowFileSystem(latency=latency)
+    start = time.time()
+    for path_to_file in Prefetcher(file_paths=file_paths, depth=depth, region_size=64 * 1024, opener=file_system.open):
+        # a plugin reads the header of the file and parses it
+        with file_system.open(path_to_file, mode='rb') as file_stream:
+            file_stream.read(1024)
+        time.sleep(processing_time)
+    return len(file_paths) / (time.time() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=50, help="Latency of the first access to a file in milliseconds")
+    parser.add_argument('--processing', type=float, default=5, help="Time the plugins need per file in milliseconds")
+    parser.add_argument('--files', type=int, default=40, help="Number of files")
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 1, 2, 4, 8], help="Prefetch depths which are measured")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path_to_dir:
+        file_paths = list()
+        for index in range(arguments.files):
+            file_path = os.path.join(path_to_dir, 'file_{}'.format(index))
+            with open(file_path, mode='wb') as file_stream:
+                file_stream.write(os.urandom(256 * 1024))
+            file_paths.append(file_path)
+
+        print('depth'.ljust(10) + 'files/s'.ljust(12) + 'speedup')
+        baseline = None
+        for depth in arguments.depths:
+            throughput = __measure(file_paths=file_paths, depth=depth, latency=arguments.latency / 1000, processing_time=arguments.processing / 1000)
+            if baseline is None:
+                baseline = throughput
+            print(str(depth).ljust(10) + '{0:.1f}'.format(throughput).ljust(12) + '{0:.2f}x'.format(throughput / baseline))
@@ -7,10 +7,14 @@ __date__ = '2019/03/17'
 
 
 import os
+import atexit
 import importlib.util
-from datetime import datetime
+from datetime import datetime, date
 import argparse
 import sys
+import re
+import collections
+from concurrent.futures import ThreadPoolExecutor
 
 BANNER_TEXT = """    __  ___     __            __                    
    /  |/  /__  / /_____ _____/ /_  ______ ___  ____ 
@@ -49,10 +53,45 @@ Examples:
 'python3 metadump.py -i INPUT -f time'                      Shows only timestamps 
 'python3 metadump.py -i INPUT -f location author_name'      Shows only information about the location and the name of the author
 
+
+With the --where option only files whose metadata matches all passed predicates are shown. A predicate consists of a category,
+an operator and a value:
+
+CATEGORY                        The file contains metadata of the category
+CATEGORY~=VALUE                 A value of the category contains VALUE (case insensitive)
+CATEGORY=VALUE / CATEGORY!=VALUE
+CATEGORY>=VALUE / CATEGORY<=VALUE / CATEGORY>VALUE / CATEGORY<VALUE
+                                Values of time, creation_time and modify_time are compared as dates (e.g. 2021-01-01),
+                                a date without time is compared with the day of the timestamp. Values of
+                                position_latitude and position_longitude are compared as decimal degrees
+                                (south and west as negative numbers)
+location within LAT1,LON1,LAT2,LON2
+                                The GPS position lies within the bounding box (south and west as negative numbers)
+
+With --first N the search stops after N matching files, with --exists it stops after the first matching file.
+The predicates only see the metadata of the selected verbosity level, a matching file is shown even if --filter hides its metadata.
+
+Examples:
+'python3 metadump.py -i INPUT -r -w author_name~=smith'                     Shows only files of an author named smith
+'python3 metadump.py -i INPUT -r -w creation_time>=2021-01-01 --first 10'   Shows the first 10 files created since 2021
+'python3 metadump.py -i INPUT -r -w "location within 47,5,55,15" --exists'  Checks if a file was created within the bounding box
+
 """
 
 MAIN_CATEGORIES = ['time', 'author', 'tool', 'location']
 
+CATEGORIES = MAIN_CATEGORIES + ['creation_time', 'modify_time', 'author_name', 'comment', 'hardware', 'software', 'position_latitude', 'position_longitude']
+
+PREDICATE_OPERATORS = ['~=', '!=', '>=', '<=', '=', '>', '<']
+
+# values of these categories are compared as timestamps and GPS coordinates
+DATE_CATEGORIES = ['time', 'creation_time', 'modify_time']
+GPS_CATEGORIES = ['position_latitude', 'position_longitude']
+
+PLUGIN_API_VERSION = 2
+
+BATCH_SIZE = 32
+
 UNICODE_SUPPORT = sys.stdout.encoding.lower().startswith('utf')
 
 ######################################################################################
@@ -76,6 +115,69 @@ class VAction(argparse.Action):
         setattr(args, self.dest, self.values)
 
 
+class Prefetcher:
+    """
+    Reads the header and the tail of upcoming files on a thread pool while the plugins are
+    still busy with the current files, so that they do not have to wait on slow storage
+    (e.g. NFS or SMB mounts). The data is only read to place it in the page cache of the
+    operating system, it is not handed over to the plugins.
+
+    The files are read ahead by depth threads as soon as they are handed over to the plugins
+    and up to depth files beyond. As the plugins get the files in batches, this includes the
+    files of the current batch.
+
+    :param opener: function which opens a file for reading, can be replaced e.g. to simulate slow storage
+    """
+    def __init__(self, file_paths, depth: int, region_size: int, opener=open):
+        self.file_paths = file_paths
+        self.depth = depth
+        self.region_size = region_size
+        self.opener = opener
+
+    def __iter__(self):
+        if self.depth <= 0:
+            yield from self.file_paths
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.depth)
+        pending = collections.deque()
+        upcoming = collections.deque()
+        file_paths = iter(self.file_paths)
+        try:
+            while True:
+                # keep the read ahead window filled
+                while len(upcoming) <= self.depth:
+                    path_to_file = next(file_paths, None)
+                    if path_to_file is None:
+                        break
+                    upcoming.append(path_to_file)
+                    pending.append(executor.submit(self.__read_ahead, path_to_file))
+                if len(upcoming) == 0:
+                    break
+                # the plugins read the file themselves, so there is no need to wait for the read ahead
+                pending.popleft()
+                yield upcoming.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def __read_ahead(self, path_to_file):
+        try:
+            with self.opener(path_to_file, mode='rb') as file_stream:
+                file_size = os.fstat(file_stream.fileno()).st_size
+                regions = [(0, self.region_size)]
+                if file_size > 2 * self.region_size:
+                    regions.append((file_size - self.region_size, self.region_size))
+                for offset, length in regions:
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(file_stream.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+                    file_stream.seek(offset)
+                    file_stream.read(length)
+        except OSError:
+            pass  # the plugins will report unreadable files themselves
+
+
 def __filter_for_category(metadata, categories: list):
     filtered_metadata = list()
     for key, value, description, category, vlevel in metadata:
@@ -90,7 +192,15 @@ def __filter_for_category(metadata, categories: list):
 
 
 def __parse_date_string(date_string):
-    datetime_formats = ['%Y:%m:%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%SZ']
+    date_string = str(date_string).strip()
+    # PDF dates like D:20220101120000+01'00'
+    if date_string.startswith('D:'):
+        date_string = date_string[2:].replace("'", '')
+    # the time zone is dropped, the timestamps are compared in the time in which they were written
+    date_string = re.sub(r'(Z(\d{2}:?\d{2})?|[+-]\d{2}:?\d{2})$', '', date_string)
+    # fractional seconds are dropped
+    date_string = re.sub(r'(\d{2}:?\d{2}:?\d{2})\.\d+$', r'\1', date_string)
+    datetime_formats = ['%Y:%m:%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%Y%m%d%H%M%S', '%Y%m%d%H%M', '%Y%m%d', '%Y-%m-%d']
     for datetime_format in datetime_formats:
         try:
             return datetime.strptime(date_string, datetime_format)
@@ -122,6 +232,17 @@ def __convert_gps_specification(gps_coordinate: str):
     return gps_coordinate, reference_direction
     
 
+def __convert_gps_coordinate_to_number(gps_coordinate: str):
+    # south and west are returned as negative numbers
+    if __extract_gps_reference_direction(gps_coordinate=gps_coordinate) is None:
+        return None
+    converted = __convert_gps_specification(gps_coordinate=gps_coordinate)
+    if converted is None:
+        return None
+    coordinate, reference_direction = converted
+    return -coordinate if reference_direction in ['S', 'W'] else coordinate
+
+
 def __extract_gps_reference_direction(gps_coordinate: str):
     directions = ['N', 'E', 'W', 'S']
     for direction in directions:
@@ -131,6 +252,72 @@ def __extract_gps_reference_direction(gps_coordinate: str):
 
 ######################################################################################
 # load plugins dynamically
+class PluginAdapter:
+    """
+    Provides the complete plugin interface for a loaded plugin.
+
+    Plugins with API version 1 only implement name() and extract_metadata(path_to_file).
+    Plugins with API version 2 (module attribute API_VERSION = 2) can additionally implement:
+        setup() / teardown()    called once before the first and after the last analysed file
+        extract_many(paths)     returns a list of (path_to_file, metadata) for several files at once
+        capabilities()          returns a dict which can contain the keys
+                                    'types'       file extensions which are handled (None for all files)
+                                    'replaces'    names of plugins which are not run on the files handled by this plugin
+                                    'categories'  categories which can be produced (None if unknown)
+                                    'cost'        relative cost of the plugin (default 1)
+    """
+    def __init__(self, plugin, api_version: int):
+        self.plugin = plugin
+        self.api_version = api_version
+        self.is_set_up = False
+        capabilities = dict()
+        if api_version >= 2 and hasattr(plugin, 'capabilities'):
+            capabilities = plugin.capabilities()
+        self.types = capabilities.get('types', None)
+        if self.types is not None:
+            self.types = [x.lower() for x in self.types]
+        self.replaces = capabilities.get('replaces', list())
+        self.categories = capabilities.get('categories', None)
+        self.cost = capabilities.get('cost', 1)
+
+    def name(self):
+        return self.plugin.name()
+
+    def handles_file(self, path_to_file) -> bool:
+        if self.types is None:
+            return True
+        return os.path.splitext(path_to_file)[1].lower() in self.types
+
+    def produces_categories(self, categories: list) -> bool:
+        if self.categories is None or categories is None:
+            return True
+        return any(x in self.categories for x in categories)
+
+    def setup(self):
+        if self.is_set_up:
+            return
+        self.is_set_up = True
+        if self.api_version >= 2 and hasattr(self.plugin, 'setup'):
+            self.plugin.setup()
+
+    def teardown(self):
+        if not self.is_set_up:
+            return
+        self.is_set_up = False
+        if self.api_version >= 2 and hasattr(self.plugin, 'teardown'):
+            self.plugin.teardown()
+
+    def extract_metadata(self, path_to_file):
+        self.setup()
+        return self.plugin.extract_metadata(path_to_file)
+
+    def extract_many(self, paths_to_files: list):
+        self.setup()
+        if self.api_version >= 2 and hasattr(self.plugin, 'extract_many'):
+            return list(self.plugin.extract_many(paths_to_files))
+        return [(path_to_file, self.plugin.extract_metadata(path_to_file)) for path_to_file in paths_to_files]
+
+
 def __load_plugins():
     path_to_plugins = os.path.dirname(os.path.realpath(__file__)) + os.sep + 'plugins'
     plugin_files = list()
@@ -143,10 +330,21 @@ def __load_plugins():
         specification = importlib.util.spec_from_file_location(name='plugin_{}'.format(counter), location=plugin_file)
         module = importlib.util.module_from_spec(specification)
         specification.loader.exec_module(module)
-        plugins.append(module.ANALYSER())
+        api_version = getattr(module, 'API_VERSION', 1)
+        if api_version > PLUGIN_API_VERSION:
+            print('WARNING: Plugin "{}" requires plugin API version {} and is not loaded'.format(plugin_file, api_version))
+            continue
+        plugins.append(PluginAdapter(plugin=module.ANALYSER(), api_version=api_version))
+    plugins = sorted(plugins, key=lambda x: x.cost)
     return plugins
 
+
+def __teardown_plugins():
+    for plugin in PLUGINS:
+        plugin.teardown()
+
 PLUGINS = __load_plugins()
+atexit.register(__teardown_plugins)
 
 
 ######################################################################################
@@ -158,13 +356,55 @@ def extract_metadata_of_file(path_to_file, specified_plugins=None):
     :param path_to_file: path to the file which should be parsed
     """
     metadata = list()
-    for plugin in PLUGINS:
-        if specified_plugins != None and plugin.name() not in specified_plugins:
-            continue
+    plugins = [x for x in PLUGINS if specified_plugins is None or x.name() in specified_plugins]
+    for plugin in __select_plugins_for_file(plugins=plugins, path_to_file=path_to_file):
         metadata += plugin.extract_metadata(path_to_file)
     return metadata
 
 
+def extract_metadata_of_files(file_paths, specified_plugins=None, categories=None, batch_size=BATCH_SIZE):
+    """
+    extracts all metadata of several files, the files are handed over to the plugins in batches
+    :param file_paths: iterable of paths to the files which should be parsed
+    :param categories: only plugins which can produce one of these categories are used
+    :return: generator of (path_to_file, metadata) in the order of file_paths
+    """
+    plugins = [x for x in PLUGINS if specified_plugins is None or x.name() in specified_plugins]
+    plugins = [x for x in plugins if x.produces_categories(categories)]
+    batch = list()
+    for path_to_file in file_paths:
+        batch.append(path_to_file)
+        if len(batch) >= batch_size:
+            yield from __extract_metadata_of_batch(batch=batch, plugins=plugins)
+            batch = list()
+    if len(batch) > 0:
+        yield from __extract_metadata_of_batch(batch=batch, plugins=plugins)
+
+
+def __extract_metadata_of_batch(batch: list, plugins: list):
+    metadata_of_files = {path_to_file: list() for path_to_file in batch}
+    plugins_of_files = {path_to_file: __select_plugins_for_file(plugins=plugins, path_to_file=path_to_file) for path_to_file in batch}
+    for plugin in plugins:
+        handled_files = [x for x in batch if plugin in plugins_of_files[x]]
+        if len(handled_files) == 0:
+            continue
+        for path_to_file, metadata in plugin.extract_many(handled_files):
+            if path_to_file not in metadata_of_files:
+                print('WARNING: Plugin "{}" returned metadata of the file "{}" which it was not asked for'.format(plugin.name(), path_to_file))
+                continue
+            metadata_of_files[path_to_file] += metadata
+    return [(path_to_file, metadata_of_files[path_to_file]) for path_to_file in batch]
+
+
+def __select_plugins_for_file(plugins: list, path_to_file):
+    # a plugin is skipped if another selected plugin which handles the file replaces it
+    handling_plugins = [x for x in plugins if x.handles_file(path_to_file)]
+    replaced_plugins = set()
+    for plugin in handling_plugins:
+        replaced_plugins.update(plugin.replaces)
+    return [x for x in handling_plugins if x.name() not in replaced_plugins]
+
+
 def get_creation_date(metadata: list):
     filtered_metadata = __filter_for_category(metadata=metadata, categories=['creation_time'])
     metadata_values = [x[1] for x in filtered_metadata]
@@ -209,6 +449,102 @@ def get_author_name(metadata: list):
     return '; '.join(metadata_values)
 
 
+def parse_predicate(expression: str):
+    """
+    parses a predicate like 'author~=smith', 'creation_time>=2021-01-01' or 'location within 47,5,55,15'
+    :return: tuple of (category, operator, value) or None if the expression is invalid
+    """
+    match = re.match(r'^\s*(\w+)\s+within\s+(.+)$', expression)
+    if match is not None:
+        if match.group(1) != 'location':
+            return None
+        try:
+            bounding_box = [float(x) for x in match.group(2).split(',')]
+        except ValueError:
+            return None
+        if len(bounding_box) != 4:
+            return None
+        return 'location', 'within', bounding_box
+
+    match = re.match(r'^\s*(\w+)\s*(?:({})\s*(.*?))?\s*$'.format('|'.join(re.escape(x) for x in PREDICATE_OPERATORS)), expression)
+    if match is None or match.group(1) not in CATEGORIES:
+        return None
+    category, operator, value = match.groups()
+    if category in DATE_CATEGORIES and operator not in [None, '~=']:
+        try:
+            # a value without time is compared with the day of the timestamp
+            value = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            value = __parse_date_string(value)
+        if value is None:
+            return None
+    elif category in GPS_CATEGORIES and operator not in [None, '~=']:
+        try:
+            value = float(value)
+        except ValueError:
+            value = __convert_gps_coordinate_to_number(gps_coordinate=value)
+        if value is None:
+            return None
+    return category, operator, value
+
+
+def matches_predicates(metadata: list, predicates: list):
+    """
+    checks if the metadata of a file matches all predicates created with parse_predicate
+    """
+    for predicate in predicates:
+        if not __matches_predicate(metadata=metadata, predicate=predicate):
+            return False
+    return True
+
+
+def __matches_predicate(metadata: list, predicate):
+    category, operator, value = predicate
+    if operator == 'within':
+        coordinates = get_GPS_coordinates(metadata=metadata)
+        if coordinates is None:
+            return False
+        lat, lat_ref, lon, lon_ref = coordinates
+        lat = -lat if lat_ref == 'S' else lat
+        lon = -lon if lon_ref == 'W' else lon
+        lat_1, lon_1, lat_2, lon_2 = value
+        return min(lat_1, lat_2) <= lat <= max(lat_1, lat_2) and min(lon_1, lon_2) <= lon <= max(lon_1, lon_2)
+
+    filtered_metadata = __filter_for_category(metadata=metadata, categories=[category])
+    metadata_values = [str(x[1]) for x in filtered_metadata if str(x[1]) != '']
+    if operator is None:
+        return len(metadata_values) > 0
+    # values which cannot be converted to a timestamp or a GPS coordinate are not compared
+    if isinstance(value, date):
+        metadata_values = [__parse_date_string(x) for x in metadata_values]
+        metadata_values = [x if isinstance(value, datetime) else x.date() for x in metadata_values if x is not None]
+    elif category in GPS_CATEGORIES and operator != '~=':
+        metadata_values = [__convert_gps_coordinate_to_number(gps_coordinate=x) for x in metadata_values]
+        metadata_values = [x for x in metadata_values if x is not None]
+    return any(__compare(x, operator, value) for x in metadata_values)
+
+
+def __compare(metadata_value, operator, value):
+    if operator == '~=':
+        return value.lower() in metadata_value.lower()
+    if isinstance(value, str):
+        try:
+            metadata_value, value = float(metadata_value), float(value)
+        except ValueError:
+            metadata_value, value = metadata_value.lower(), value.lower()
+    if operator == '=':
+        return metadata_value == value
+    if operator == '!=':
+        return metadata_value != value
+    if operator == '>=':
+        return metadata_value >= value
+    if operator == '<=':
+        return metadata_value <= value
+    if operator == '>':
+        return metadata_value > value
+    return metadata_value < value
+
+
 ######################################################################################
 # main program
 def __progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=70):
@@ -225,20 +561,48 @@ def __progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=70
         print()
 
 
-def __extract_metadata_of_list_of_files(file_paths: list, path_to_input, arguments):
+def __iterate_input_files(path_to_input, recursive):
+    # the directories are walked lazily, so that a search can be stopped early
+    if not os.path.isdir(path_to_input):
+        yield path_to_input
+        return
+    directory_queue = [path_to_input]
+    while len(directory_queue) > 0:
+        path_to_dir = directory_queue.pop(0)
+        for file_path in os.listdir(path_to_dir):
+            file_path = os.path.join(path_to_dir, file_path)
+            if os.path.isdir(file_path):
+                if recursive:
+                    directory_queue.append(file_path)
+            else:
+                yield file_path
+
+
+def __extract_metadata_of_files(file_paths, arguments, predicates: list, batch_size=BATCH_SIZE):
+    # plugins are only skipped if neither the displayed nor the queried categories can be produced by them
+    categories = None
+    if arguments.filter is not None:
+        categories = arguments.filter + [category for category, _, _ in predicates]
+    prefetcher = Prefetcher(file_paths=file_paths, depth=arguments.prefetch, region_size=arguments.prefetchsize * 1024)
+    return extract_metadata_of_files(file_paths=prefetcher, specified_plugins=arguments.plugins, categories=categories, batch_size=batch_size)
+
+
+def __extract_metadata_of_list_of_files(file_paths: list, path_to_input, arguments, predicates: list):
     extracted = list()
     total_number_of_files = len(file_paths)
     __progress_bar(iteration=0, total=total_number_of_files, prefix='Analysing Files:', suffix='', decimals=2)
-    for index, path_to_file in enumerate(file_paths):
-        metadata = extract_metadata_of_file(path_to_file=path_to_file, specified_plugins=arguments.plugins)
-        extracted.append((path_to_file, metadata))
+    metadata_of_files = __extract_metadata_of_files(file_paths=file_paths, arguments=arguments, predicates=predicates)
+    for index, (path_to_file, metadata) in enumerate(metadata_of_files):
+        # the predicates are applied to the metadata of the displayed verbosity level
+        metadata = __filter_for_verbosity(arguments=arguments, metadata=metadata)
+        if matches_predicates(metadata=metadata, predicates=predicates):
+            extracted.append((path_to_file, metadata))
         __progress_bar(iteration=index+1, total=total_number_of_files, prefix='Analysing Files:', suffix='', decimals=2)
     print()
     return extracted
 
 
-def __preprocess_extracted_metadata(arguments, metadata):
-    # filter verbosity level 
+def __filter_for_verbosity(arguments, metadata):
     filtered_metadata = list()
     for key, value, description, category, vlevel in metadata:
         value = str(value)
@@ -248,7 +612,12 @@ def __preprocess_extracted_metadata(arguments, metadata):
             if value == '':
                 continue
         filtered_metadata.append((str(key), value, description, category, vlevel))
-    metadata = filtered_metadata
+    return filtered_metadata
+
+
+def __preprocess_extracted_metadata(arguments, metadata):
+    # filter verbosity level 
+    metadata = __filter_for_verbosity(arguments=arguments, metadata=metadata)
 
     # applies filter
     if arguments.filter != None:
@@ -261,9 +630,9 @@ def __preprocess_extracted_metadata(arguments, metadata):
     return metadata
 
 
-def __display_result(arguments, metadata_of_files, path_to_input, display_part_of_stream=False):
+def __display_result(arguments, metadata_of_files, path_to_input, display_part_of_stream=False, show_empty_files=False):
     # filter empty files
-    if not arguments.showemptyfiles: 
+    if not arguments.showemptyfiles and not show_empty_files:
         metadata_of_files = [(file_path, metadata) for file_path, metadata in metadata_of_files if len(metadata) > 0]
 
     # shorten the file paths
@@ -287,7 +656,10 @@ def __display_result(arguments, metadata_of_files, path_to_input, display_part_o
         print(100*'=')
         print('File: {}'.format(file_name))
         if len(metadata) == 0:
-            print('\tNo metadata found\n')
+            if arguments.filter != None:
+                print('\tNo metadata of the selected categories found\n')
+            else:
+                print('\tNo metadata found\n')
             continue
 
         if arguments.order:
@@ -354,6 +726,11 @@ if __name__ == '__main__':
     parser.add_argument('--showplugins', action='store_true', default=False, help="Prints all loaded plugins")
     parser.add_argument('-p', '--plugins', nargs='+', default=None, help="Only use the specified Plugins")
     parser.add_argument('--showemptyfiles', action='store_true', default=False, help="Prints a file although no metadata could be extracted")
+    parser.add_argument('--prefetch', type=int, default=0, help="Number of threads which read the beginning and the end of upcoming files in the background (useful on network shares)")
+    parser.add_argument('--prefetchsize', type=int, default=64, help="Kilobytes which are read ahead from the beginning and the end of each file")
+    parser.add_argument('-w', '--where', nargs='+', default=None, help="Only show files whose metadata matches all predicates, e.g. author~=smith (see --filteroptions)")
+    parser.add_argument('--first', type=int, default=None, help="Stop the search after N matching files")
+    parser.add_argument('--exists', action='store_true', default=False, help="Stop the search after the first matching file, exits with 0 if a file was found and with 1 otherwise")
     
     arguments = parser.parse_args()
     
@@ -383,41 +760,67 @@ if __name__ == '__main__':
         print('ERROR: Path "{}" does not exist\n'.format(path_to_input))
         exit()
 
-    # gather absolute paths to the files which should be scanned
-    input_list = list()
-    if os.path.isdir(path_to_input):
-        directory_queue = [path_to_input]
-        while len(directory_queue) > 0:
-            path_to_dir = directory_queue.pop(0)
-            for file_path in os.listdir(path_to_dir):
-                file_path = os.path.join(path_to_dir, file_path)
-                if os.path.isdir(file_path):
-                    if arguments.recursive:
-                        directory_queue.append(file_path)
-                else:
-                    input_list.append(file_path)
-    else:
-        input_list.append(path_to_input)
-    
-    if len(input_list) == 0:
-        print('no files found')
+    # parse the predicates, "location within BBOX" may have been passed as separate arguments
+    predicates = list()
+    expressions = list()
+    for expression in arguments.where or list():
+        if len(expressions) > 0 and (expression == 'within' or expressions[-1].endswith(' within')):
+            expressions[-1] += ' ' + expression
+        else:
+            expressions.append(expression)
+    for expression in expressions:
+        predicate = parse_predicate(expression)
+        if predicate is None:
+            print('ERROR: Invalid predicate "{}", see --filteroptions\n'.format(expression))
+            exit()
+        predicates.append(predicate)
+
+    if arguments.first is not None and arguments.first < 1:
+        print('ERROR: The number passed to --first must be at least 1\n')
         exit()
+
+    if arguments.exists:
+        maximal_number_of_matches = 1
+    else:
+        maximal_number_of_matches = arguments.first
+
+    # gather absolute paths to the files which should be scanned
+    input_files = __iterate_input_files(path_to_input=path_to_input, recursive=arguments.recursive)
+    if maximal_number_of_matches is None:
+        input_files = list(input_files)
+        if len(input_files) == 0:
+            print('no files found')
+            exit()
     
     try:
-        if arguments.stream:
-            for path_to_file in input_list:
-                extract_metadata = extract_metadata_of_file(path_to_file=path_to_file, specified_plugins=arguments.plugins)
-                metadata_of_files = [(path_to_file, extract_metadata)]
+        if arguments.stream or maximal_number_of_matches is not None:
+            number_of_matches = 0
+            # files are analysed one by one, so that the search can stop directly after the last needed match
+            for path_to_file, extract_metadata in __extract_metadata_of_files(file_paths=input_files, arguments=arguments, predicates=predicates, batch_size=1):
+                # the predicates are applied to the metadata of the displayed verbosity level
+                extract_metadata = __filter_for_verbosity(arguments=arguments, metadata=extract_metadata)
+                if not matches_predicates(metadata=extract_metadata, predicates=predicates):
+                    continue
                 # preprocess the extracted metadata
-                metadata_of_files = [ (path_to_file, __preprocess_extracted_metadata(arguments=arguments, metadata=metadata)) for path_to_file, metadata in metadata_of_files]
-                # display metadata
-                __display_result(arguments, metadata_of_files=metadata_of_files, path_to_input=path_to_input, display_part_of_stream=True)
+                metadata_of_files = [(path_to_file, __preprocess_extracted_metadata(arguments=arguments, metadata=extract_metadata))]
+                # without predicates only files which are displayed count as matches
+                if len(predicates) == 0 and len(metadata_of_files[0][1]) == 0 and not arguments.showemptyfiles:
+                    continue
+                number_of_matches += 1
+                # display metadata, matching files are displayed even if --filter hides all of their metadata
+                __display_result(arguments, metadata_of_files=metadata_of_files, path_to_input=path_to_input, display_part_of_stream=True, show_empty_files=True)
+                if maximal_number_of_matches is not None and number_of_matches >= maximal_number_of_matches:
+                    break
+            if maximal_number_of_matches is not None and number_of_matches == 0:
+                print('No matching file found')
+            if arguments.exists:
+                exit(0 if number_of_matches > 0 else 1)
         else:
-            metadata_of_files = __extract_metadata_of_list_of_files(file_paths=input_list, path_to_input=path_to_input, arguments=arguments)
+            metadata_of_files = __extract_metadata_of_list_of_files(file_paths=input_files, path_to_input=path_to_input, arguments=arguments, predicates=predicates)
             # preprocess the extracted metadata
             metadata_of_files = [ (path_to_file, __preprocess_extracted_metadata(arguments=arguments, metadata=metadata)) for path_to_file, metadata in metadata_of_files]
-            # display metadata
-            __display_result(arguments, metadata_of_files=metadata_of_files, path_to_input=path_to_input)
+            # display metadata, matching files are displayed even if --filter hides all of their metadata
+            __display_result(arguments, metadata_of_files=metadata_of_files, path_to_input=path_to_input, show_empty_files=len(predicates) > 0)
     except KeyboardInterrupt:
         print()
         print('Keyboard Interrupt: Stopping search')
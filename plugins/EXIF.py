@@ -46,6 +46,15 @@ class Exif_Analyser:
 
     def extract_metadata(self, path_to_file: str) -> dict:
         metadata = self.__extract_metadata(path_to_file=path_to_file)
+        if metadata is None:
+            return list()
+        return self.decode_exif(exif=metadata)
+
+    def decode_exif(self, exif: dict, description='embedded EXIF metadata') -> list:
+        """
+        decodes EXIF tags (tag id -> value as returned by Pillow) and maps them onto the categories
+        """
+        metadata = self.__decode_metadata(metadata=exif, description=description)
         metadata = self.__enrich_with_GPS_Information(metadata=metadata)
         metadata = [(key, metadata[key][0], metadata[key][1]) for key in metadata]
         metadata = self.__enrich_with_categories(metadata=metadata)
@@ -62,15 +71,13 @@ class Exif_Analyser:
         try:
             image_file = Image.open(path_to_file, mode='r')
             try:
-                metadata = image_file._getexif()
-                metadata = self.__decode_metadata(metadata=metadata)
-                return metadata
+                return image_file._getexif()
             except AttributeError:
-                return list()
+                return None
         except OSError:
-            return list()
+            return None
         
-    def __decode_metadata(self, metadata: dict) -> dict:
+    def __decode_metadata(self, metadata: dict, description: str) -> dict:
         decoded = dict()
         for (tag, value) in metadata.items():
             decoded_key = TAGS.get(tag, tag)
@@ -81,7 +88,7 @@ class Exif_Analyser:
                     decoded_value = '[DECODING ERROR]'
             else:
                 decoded_value = value
-            decoded[decoded_key] = (decoded_value, 'embedded EXIF metadata')
+            decoded[decoded_key] = (decoded_value, description)
         return decoded
 
     ############################################################################################## 
@@ -0,0 +1,338 @@
+import os
+import struct
+import zlib
+import importlib.util
+from PIL import Image
+
+
+API_VERSION = 2
+
+# chunks and boxes which are read into memory must not be larger than this
+MAX_READ_SIZE = 1024 * 1024
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_XMP_KEYWORD = 'XML:com.adobe.xmp'
+PNG_RAW_EXIF_KEYWORDS = ['Raw profile type exif', 'Raw profile type APP1']
+
+WEBP_IMAGE_DATA_CHUNKS = [b'VP8 ', b'VP8L', b'ALPH', b'ANMF']
+WEBP_FLAG_EXIF = 0x08
+WEBP_FLAG_XMP = 0x04
+
+HEIF_BRANDS = [b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1', b'avif', b'avis']
+
+IMAGE_CHUNK_TYPES = ['.png', '.webp', '.heic', '.heif', '.hif', '.avif']
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+
+
+KEY_TO_CATEGORIES = dict()
+KEY_TO_CATEGORIES['PNG:Creation Time'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['PNG:tIME'] = (['time', 'modify_time'], 1)
+KEY_TO_CATEGORIES['PNG:Author'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['PNG:Copyright'] = (['author'], 1)
+KEY_TO_CATEGORIES['PNG:Comment'] = (['author', 'comment'], 1)
+KEY_TO_CATEGORIES['PNG:Description'] = (['author', 'comment'], 1)
+KEY_TO_CATEGORIES['PNG:Software'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['PNG:Source'] = (['tool', 'hardware'], 1)
+
+
+def __load_sibling_plugin(file_name):
+    # a plugin which cannot be loaded (e.g. because of a missing library) only disables the payloads decoded by it
+    path_to_plugin = os.path.join(os.path.dirname(os.path.realpath(__file__)), file_name)
+    try:
+        specification = importlib.util.spec_from_file_location(name='plugin_image_chunks_{}'.format(file_name[:-3]), location=path_to_plugin)
+        module = importlib.util.module_from_spec(specification)
+        specification.loader.exec_module(module)
+    except Exception:
+        return None
+    return module
+
+
+# the embedded payloads are decoded and categorised by the EXIF and XMP plugins,
+# the boxes of HEIF files are walked with the functions of the Video plugin
+EXIF_PLUGIN = __load_sibling_plugin('EXIF.py')
+XMP_PLUGIN = __load_sibling_plugin('XMP.py')
+VIDEO_PLUGIN = __load_sibling_plugin('Video.py')
+
+
+class Image_Chunk_Analyser:
+    """
+    Extracts EXIF, XMP and text metadata embedded in PNG, WebP and HEIF/AVIF files by walking
+    their chunk or box structure. The image data itself is never read.
+    """
+    def __init__(self):
+        self.exif_analyser = None
+        self.xmp_analyser = None
+        self.is_set_up = False
+
+    def name(self):
+        return 'ImageChunks'
+
+    def capabilities(self):
+        decoders = [x for x in [EXIF_PLUGIN, XMP_PLUGIN] if x is not None]
+        categories = set()
+        for key_to_categories in [KEY_TO_CATEGORIES] + [x.KEY_TO_CATEGORIES for x in decoders]:
+            for category, _ in key_to_categories.values():
+                categories.update(category)
+        # the EXIF and XMP plugins are not run on these files as long as this plugin is used, so the payloads are only reported once
+        replaces = [x.ANALYSER().name() for x in decoders]
+        return {'types': IMAGE_CHUNK_TYPES, 'replaces': replaces, 'categories': sorted(categories), 'cost': 1}
+
+    def setup(self):
+        if EXIF_PLUGIN is not None:
+            self.exif_analyser = EXIF_PLUGIN.ANALYSER()
+        if XMP_PLUGIN is not None:
+            self.xmp_analyser = XMP_PLUGIN.ANALYSER()
+        self.is_set_up = True
+
+    def teardown(self):
+        self.exif_analyser = None
+        self.xmp_analyser = None
+        self.is_set_up = False
+
+    def extract_metadata(self, path_to_file: str) -> dict:
+        if not self.is_set_up:
+            self.setup()
+        metadata = list()
+        for payload_type, payload, description in self.__extract_payloads(path_to_file=path_to_file):
+            if payload_type == 'exif':
+                if self.exif_analyser is not None:
+                    metadata += self.__decode_exif(payload=payload, description=description)
+            elif payload_type == 'xmp':
+                if self.xmp_analyser is not None:
+                    metadata += self.xmp_analyser.decode_xmp(xmp_packet=payload.decode('utf-8', 'ignore'), description=description)
+            else:
+                key, value = payload
+                category, vlevel = KEY_TO_CATEGORIES.get(key, (list(), 3))
+                metadata.append((key, value, description, category, vlevel))
+        return metadata
+
+    def __decode_exif(self, payload, description):
+        try:
+            exif = Image.Exif()
+            exif.load(payload)
+            decoded = dict(exif)
+            # merge the EXIF and GPS sub IFDs like Pillow's _getexif() does for JPEG files
+            decoded.update(exif.get_ifd(EXIF_IFD))
+            gps_info = exif.get_ifd(GPS_IFD)
+            if len(gps_info) > 0:
+                decoded[GPS_IFD] = gps_info
+        except Exception:
+            return list()
+        return self.exif_analyser.decode_exif(exif=decoded, description=description)
+
+    def __extract_payloads(self, path_to_file):
+        try:
+            with open(path_to_file, mode='rb') as file_stream:
+                signature = file_stream.read(12)
+                if signature[:8] == PNG_SIGNATURE:
+                    return self.__extract_png_payloads(file_stream=file_stream)
+                if signature[:4] == b'RIFF' and signature[8:12] == b'WEBP':
+                    return self.__extract_webp_payloads(file_stream=file_stream)
+                if signature[4:8] == b'ftyp' and VIDEO_PLUGIN is not None:
+                    return self.__extract_heif_payloads(file_stream=file_stream)
+                return list()
+        except (OSError, struct.error, ValueError, IndexError, zlib.error):
+            return list()
+
+    ##############################################################################################
+    # PNG
+
+    def __extract_png_payloads(self, file_stream):
+        payloads = list()
+        offset = len(PNG_SIGNATURE)
+        while True:
+            file_stream.seek(offset)
+            header = file_stream.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == b'IEND':
+                break
+            if chunk_type in [b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'] and length <= MAX_READ_SIZE:
+                payloads += self.__parse_png_chunk(chunk_type=chunk_type, data=file_stream.read(length))
+            # the image data chunks are skipped without reading them, metadata can also be located behind them
+            offset += 12 + length
+        return payloads
+
+    def __parse_png_chunk(self, chunk_type, data):
+        description = 'embedded PNG {} chunk'.format(chunk_type.decode('latin-1'))
+        if chunk_type == b'eXIf':
+            return [('exif', data, 'embedded EXIF metadata (PNG eXIf chunk)')]
+        if chunk_type == b'tIME':
+            year, month, day, hour, minute, second = struct.unpack('>HBBBBB', data[:7])
+            value = '{0:04d}:{1:02d}:{2:02d} {3:02d}:{4:02d}:{5:02d}'.format(year, month, day, hour, minute, second)
+            return [('text', ('PNG:tIME', value), description)]
+
+        keyword, _, text = data.partition(b'\x00')
+        keyword = keyword.decode('latin-1')
+        if chunk_type == b'tEXt':
+            text = text.decode('latin-1')
+        elif chunk_type == b'zTXt':
+            text = self.__decompress(data=text[1:]).decode('latin-1')
+        else:
+            compressed = text[0] == 1
+            _, _, text = text[2:].partition(b'\x00')    # language tag
+            _, _, text = text.partition(b'\x00')        # translated keyword
+            if compressed:
+                text = self.__decompress(data=text)
+            text = text.decode('utf-8', 'ignore')
+
+        if keyword == PNG_XMP_KEYWORD:
+            return [('xmp', text.encode('utf-8'), 'embedded XMP metadata (PNG iTXt chunk)')]
+        if keyword in PNG_RAW_EXIF_KEYWORDS:
+            # written by ImageMagick: name, length and hex encoded data on separate lines
+            lines = text.strip().split('\n')
+            exif = bytes.fromhex(''.join(lines[2:]))
+            return [('exif', exif, 'embedded EXIF metadata (PNG {} chunk)'.format(chunk_type.decode('latin-1')))]
+        return [('text', ('PNG:' + keyword, text), description)]
+
+    @staticmethod
+    def __decompress(data):
+        # the inflated text is limited, a small chunk could otherwise expand to gigabytes
+        return zlib.decompressobj().decompress(data, MAX_READ_SIZE)
+
+    ##############################################################################################
+    # WebP
+
+    def __extract_webp_payloads(self, file_stream):
+        payloads = list()
+        file_stream.seek(0, 2)
+        end = min(file_stream.tell(), struct.unpack('<I', self.__read_at(file_stream, 4, 4))[0] + 8)
+        flags = 0
+        offset = 12
+        while offset + 8 <= end:
+            chunk_type, length = struct.unpack('<4sI', self.__read_at(file_stream, offset, 8))
+            if chunk_type == b'VP8X':
+                flags = self.__read_at(file_stream, offset + 8, 1)[0]
+            elif chunk_type in WEBP_IMAGE_DATA_CHUNKS and not flags & (WEBP_FLAG_EXIF | WEBP_FLAG_XMP):
+                break  # there is no metadata behind the image data
+            elif chunk_type == b'EXIF' and length <= MAX_READ_SIZE:
+                payloads.append(('exif', self.__read_at(file_stream, offset + 8, length), 'embedded EXIF metadata (WebP EXIF chunk)'))
+            elif chunk_type == b'XMP ' and length <= MAX_READ_SIZE:
+                payloads.append(('xmp', self.__read_at(file_stream, offset + 8, length), 'embedded XMP metadata (WebP XMP chunk)'))
+            # the image data chunks are skipped without reading them
+            offset += 8 + length + (length % 2)
+        return payloads
+
+    ##############################################################################################
+    # HEIF / AVIF
+
+    def __extract_heif_payloads(self, file_stream):
+        file_stream.seek(0, 2)
+        file_size = file_stream.tell()
+        for box_type, payload_offset, payload_size in VIDEO_PLUGIN.iterate_boxes_in_file(file_stream, 0, file_size):
+            if box_type == b'ftyp':
+                brands = self.__read_at(file_stream, payload_offset, min(payload_size, 256))
+                brands = [brands[x:x + 4] for x in range(0, len(brands), 4)]
+                if not any(x in HEIF_BRANDS for x in brands):
+                    return list()
+            elif box_type == b'mdat':
+                break
+            elif box_type == b'meta' and payload_size <= MAX_READ_SIZE:
+                meta = self.__read_at(file_stream, payload_offset, payload_size)
+                return self.__parse_heif_meta(file_stream=file_stream, meta=meta[4:])    # skip version and flags
+        return list()
+
+    def __parse_heif_meta(self, file_stream, meta):
+        items = dict()
+        locations = dict()
+        item_data = b''
+        for box_type, data in VIDEO_PLUGIN.iterate_boxes(meta):
+            if box_type == b'iinf':
+                items = self.__parse_iinf(data=data)
+            elif box_type == b'iloc':
+                locations = self.__parse_iloc(data=data)
+            elif box_type == b'idat':
+                item_data = data
+
+        payloads = list()
+        for item_id, (item_type, content_type) in items.items():
+            if item_type == b'Exif':
+                payload_type = 'exif'
+                description = 'embedded EXIF metadata (HEIF Exif item)'
+            elif item_type == b'mime' and content_type == 'application/rdf+xml':
+                payload_type = 'xmp'
+                description = 'embedded XMP metadata (HEIF mime item)'
+            else:
+                continue
+            if item_id not in locations:
+                continue
+            construction_method, extents = locations[item_id]
+            if sum(length for _, length in extents) > MAX_READ_SIZE:
+                continue
+            if construction_method == 0:
+                data = b''.join(self.__read_at(file_stream, offset, length) for offset, length in extents)
+            elif construction_method == 1:
+                data = b''.join(item_data[offset:offset + length] for offset, length in extents)
+            else:
+                continue
+            if payload_type == 'exif':
+                # the Exif item starts with the offset to the TIFF header
+                data = data[4 + struct.unpack('>I', data[:4])[0]:]
+            payloads.append((payload_type, data, description))
+        return payloads
+
+    def __parse_iinf(self, data):
+        items = dict()
+        version = data[0]
+        offset = 6 if version == 0 else 8
+        for box_type, infe in VIDEO_PLUGIN.iterate_boxes(data[offset:]):
+            infe_version = infe[0]
+            if box_type != b'infe' or infe_version < 2:
+                continue
+            if infe_version == 2:
+                item_id, = struct.unpack('>H', infe[4:6])
+                position = 6
+            else:
+                item_id, = struct.unpack('>I', infe[4:8])
+                position = 8
+            item_type = infe[position + 2:position + 6]
+            _, _, rest = infe[position + 6:].partition(b'\x00')     # item name
+            content_type = rest.partition(b'\x00')[0].decode('latin-1') if item_type == b'mime' else None
+            items[item_id] = (item_type, content_type)
+        return items
+
+    def __parse_iloc(self, data):
+        locations = dict()
+        version = data[0]
+        offset_size = data[4] >> 4
+        length_size = data[4] & 0x0F
+        base_offset_size = data[5] >> 4
+        index_size = data[5] & 0x0F if version in [1, 2] else 0
+        if version < 2:
+            item_count, = struct.unpack('>H', data[6:8])
+            position = 8
+        else:
+            item_count, = struct.unpack('>I', data[6:10])
+            position = 10
+
+        def read_number(size):
+            nonlocal position
+            value = int.from_bytes(data[position:position + size], 'big')
+            position += size
+            return value
+
+        for _ in range(item_count):
+            item_id = read_number(2 if version < 2 else 4)
+            construction_method = read_number(2) & 0x0F if version in [1, 2] else 0
+            read_number(2)  # data reference index
+            base_offset = read_number(base_offset_size)
+            extent_count = read_number(2)
+            extents = list()
+            for _ in range(extent_count):
+                read_number(index_size)
+                extent_offset = read_number(offset_size)
+                extent_length = read_number(length_size)
+                extents.append((base_offset + extent_offset, extent_length))
+            locations[item_id] = (construction_method, extents)
+        return locations
+
+    @staticmethod
+    def __read_at(file_stream, offset, size):
+        file_stream.seek(offset)
+        return file_stream.read(size)
+
+
+ANALYSER = Image_Chunk_Analyser
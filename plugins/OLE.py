@@ -0,0 +1,311 @@
+import struct
+from datetime import datetime, timedelta
+
+
+API_VERSION = 2
+
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+MAX_REGULAR_SECTOR = 0xFFFFFFFA
+MAX_STREAM_SIZE = 1024 * 1024
+
+FILETIME_EPOCH = datetime(1601, 1, 1)
+
+SUMMARY_INFORMATION = '\x05SummaryInformation'
+DOCUMENT_SUMMARY_INFORMATION = '\x05DocumentSummaryInformation'
+
+# property ids of the property sets, the names are the ones used by the OOXML formats
+PROPERTY_NAMES = dict()
+PROPERTY_NAMES[SUMMARY_INFORMATION] = {
+    2: 'title', 3: 'subject', 4: 'creator', 5: 'keywords', 6: 'description', 7: 'Template',
+    8: 'lastModifiedBy', 9: 'revision', 10: 'TotalTime', 11: 'lastPrinted', 12: 'created',
+    13: 'modified', 14: 'Pages', 15: 'Words', 16: 'Characters', 18: 'Application', 19: 'DocSecurity'
+}
+PROPERTY_NAMES[DOCUMENT_SUMMARY_INFORMATION] = {
+    2: 'category', 3: 'PresentationFormat', 4: 'Bytes', 5: 'Lines', 6: 'Paragraphs', 7: 'Slides',
+    8: 'Notes', 9: 'HiddenSlides', 10: 'MMClips', 11: 'ScaleCrop', 14: 'Manager', 15: 'Company',
+    16: 'LinksUpToDate', 17: 'CharactersWithSpaces', 19: 'SharedDoc', 22: 'HyperlinksChanged', 23: 'AppVersion'
+}
+
+
+KEY_TO_CATEGORIES = dict()
+KEY_TO_CATEGORIES['lastPrinted'] = (['time'], 1)
+KEY_TO_CATEGORIES['created'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['modified'] = (['time', 'modify_time'], 1)
+
+KEY_TO_CATEGORIES['Application'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['AppVersion'] = (['tool', 'software'], 1)
+
+KEY_TO_CATEGORIES['lastModifiedBy'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['creator'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['Company'] = (['author'], 1)
+KEY_TO_CATEGORIES['Manager'] = (['author'], 1)
+
+
+class Compound_File:
+    """
+    Minimal reader for the Compound File Binary format. Sectors of the FAT, the mini FAT,
+    the directory and the streams are only read when they are needed.
+    """
+    def __init__(self, file_stream):
+        self.file_stream = file_stream
+        header = file_stream.read(512)
+        if len(header) < 512 or header[:8] != OLE_SIGNATURE:
+            raise ValueError('not a compound file')
+        major_version, = struct.unpack('<H', header[0x1A:0x1C])
+        sector_shift, mini_sector_shift = struct.unpack('<HH', header[0x1E:0x22])
+        if sector_shift not in [9, 12]:
+            raise ValueError('invalid sector size')
+        self.is_version_3 = major_version == 3
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+        self.entries_per_sector = self.sector_size // 4
+        self.first_directory_sector, = struct.unpack('<I', header[0x30:0x34])
+        self.mini_stream_cutoff, self.first_mini_fat_sector = struct.unpack('<II', header[0x38:0x40])
+        self.first_difat_sector, = struct.unpack('<I', header[0x44:0x48])
+        self.difat = list(struct.unpack('<109I', header[0x4C:0x200]))
+        self.next_difat_sector = self.first_difat_sector
+
+        file_stream.seek(0, 2)
+        self.max_chain_length = file_stream.tell() // self.sector_size + 1
+        self.fat_sectors = dict()
+        self.mini_fat_chain = list()
+        self.mini_stream_chain = list()
+        self.root_entry = None
+
+    def read_stream(self, name):
+        """
+        returns the content of a stream in the root storage or None if it does not exist
+        """
+        entry = self.__find_directory_entry(name=name)
+        if entry is None:
+            return None
+        start_sector, size = entry
+        size = min(size, MAX_STREAM_SIZE)
+        if size < self.mini_stream_cutoff:
+            return self.__read_mini_stream(start_sector=start_sector, size=size)
+        data = bytearray()
+        for sector in self.__iterate_chain(start_sector=start_sector):
+            if len(data) >= size:
+                break
+            data += self.__read_sector(sector=sector)
+        return bytes(data[:size])
+
+    def __find_directory_entry(self, name):
+        for index, sector in enumerate(self.__iterate_chain(start_sector=self.first_directory_sector)):
+            data = self.__read_sector(sector=sector)
+            for offset in range(0, len(data), 128):
+                entry = data[offset:offset + 128]
+                name_length, entry_type = struct.unpack('<HB', entry[0x40:0x43])
+                entry_name = entry[:max(name_length - 2, 0)].decode('utf-16-le', 'ignore')
+                start_sector, size = struct.unpack('<IQ', entry[0x74:0x80])
+                if self.is_version_3:
+                    size &= 0xFFFFFFFF
+                if index == 0 and offset == 0:
+                    self.root_entry = (start_sector, size)
+                if entry_type == 2 and entry_name == name:
+                    return start_sector, size
+        return None
+
+    def __read_mini_stream(self, start_sector, size):
+        data = bytearray()
+        mini_sector = start_sector
+        for _ in range(self.max_chain_length * (self.sector_size // self.mini_sector_size)):
+            if len(data) >= size or mini_sector >= MAX_REGULAR_SECTOR:
+                break
+            # position of the mini sector inside the mini stream, which is stored in the chain of the root entry
+            position = mini_sector * self.mini_sector_size
+            sector = self.__get_chain_entry(chain=self.mini_stream_chain, start_sector=self.root_entry[0], index=position // self.sector_size)
+            if sector is None:
+                break
+            self.file_stream.seek(self.__sector_offset(sector=sector) + position % self.sector_size)
+            data += self.file_stream.read(self.mini_sector_size)
+            mini_sector = self.__next_mini_sector(mini_sector=mini_sector)
+        return bytes(data[:size])
+
+    def __next_mini_sector(self, mini_sector):
+        sector = self.__get_chain_entry(chain=self.mini_fat_chain, start_sector=self.first_mini_fat_sector, index=mini_sector // self.entries_per_sector)
+        if sector is None:
+            return MAX_REGULAR_SECTOR
+        self.file_stream.seek(self.__sector_offset(sector=sector) + (mini_sector % self.entries_per_sector) * 4)
+        return struct.unpack('<I', self.file_stream.read(4))[0]
+
+    def __get_chain_entry(self, chain: list, start_sector, index):
+        # chains are only followed as far as needed, the visited sectors are remembered in chain
+        if len(chain) == 0:
+            if start_sector >= MAX_REGULAR_SECTOR:
+                return None
+            chain.append(start_sector)
+        while len(chain) <= index:
+            if len(chain) > self.max_chain_length:
+                return None
+            next_sector = self.__next_sector(sector=chain[-1])
+            if next_sector >= MAX_REGULAR_SECTOR:
+                return None
+            chain.append(next_sector)
+        return chain[index]
+
+    def __iterate_chain(self, start_sector):
+        sector = start_sector
+        for _ in range(self.max_chain_length):
+            if sector >= MAX_REGULAR_SECTOR:
+                return
+            yield sector
+            sector = self.__next_sector(sector=sector)
+
+    def __next_sector(self, sector):
+        fat_index = sector // self.entries_per_sector
+        if fat_index not in self.fat_sectors:
+            fat_sector = self.__get_fat_sector(fat_index=fat_index)
+            if fat_sector is None:
+                return MAX_REGULAR_SECTOR
+            data = self.__read_sector(sector=fat_sector)
+            self.fat_sectors[fat_index] = struct.unpack('<{}I'.format(len(data) // 4), data)
+        entries = self.fat_sectors[fat_index]
+        if sector % self.entries_per_sector >= len(entries):
+            return MAX_REGULAR_SECTOR
+        return entries[sector % self.entries_per_sector]
+
+    def __get_fat_sector(self, fat_index):
+        # the first 109 FAT sectors are listed in the header, the others in the DIFAT sectors
+        while fat_index >= len(self.difat):
+            if self.next_difat_sector >= MAX_REGULAR_SECTOR or len(self.difat) > self.max_chain_length:
+                return None
+            data = self.__read_sector(sector=self.next_difat_sector)
+            entries = struct.unpack('<{}I'.format(self.entries_per_sector), data)
+            self.difat += entries[:-1]
+            self.next_difat_sector = entries[-1]
+        fat_sector = self.difat[fat_index]
+        if fat_sector >= MAX_REGULAR_SECTOR:
+            return None
+        return fat_sector
+
+    def __read_sector(self, sector):
+        self.file_stream.seek(self.__sector_offset(sector=sector))
+        data = self.file_stream.read(self.sector_size)
+        if len(data) < self.sector_size:
+            raise ValueError('sector {} is out of bounds'.format(sector))
+        return data
+
+    def __sector_offset(self, sector):
+        return (sector + 1) * self.sector_size
+
+
+class OLE_Analyser:
+    """
+    Reads the property sets of legacy Microsoft Office documents (.doc, .xls, .ppt), only the
+    SummaryInformation and DocumentSummaryInformation streams are read from the compound file.
+    """
+    def name(self):
+        return 'OLE'
+
+    def capabilities(self):
+        categories = set()
+        for category, _ in KEY_TO_CATEGORIES.values():
+            categories.update(category)
+        types = ['.doc', '.dot', '.xls', '.xlt', '.xla', '.ppt', '.pot', '.pps', '.vsd', '.pub']
+        return {'types': types, 'categories': sorted(categories), 'cost': 1}
+
+    def extract_metadata(self, path_to_file: str) -> dict:
+        metadata = self.__extract_metadata(path_to_file=path_to_file)
+        metadata = self.__enrich_with_categories(metadata=metadata)
+        return metadata
+
+    def __enrich_with_categories(self, metadata: dict) -> dict:
+        enriched_metadata = list()
+        for key, value, describtion in metadata:
+            category, vlevel = KEY_TO_CATEGORIES.get(key, (list(), 3))
+            enriched_metadata.append((key, value, describtion, category, vlevel))
+        return enriched_metadata
+
+    def __extract_metadata(self, path_to_file):
+        try:
+            with open(path_to_file, mode='rb') as file_stream:
+                if file_stream.read(8) != OLE_SIGNATURE:
+                    return list()
+                file_stream.seek(0)
+                compound_file = Compound_File(file_stream=file_stream)
+                metadata = list()
+                for stream_name in [SUMMARY_INFORMATION, DOCUMENT_SUMMARY_INFORMATION]:
+                    data = compound_file.read_stream(name=stream_name)
+                    if data is not None:
+                        metadata += self.__parse_property_set(data=data, stream_name=stream_name)
+                return metadata
+        except (OSError, struct.error, ValueError, IndexError, OverflowError):
+            return list()
+
+    def __parse_property_set(self, data, stream_name):
+        description = 'Microsoft Office (OLE2) - {}'.format(stream_name[1:])
+        number_of_sections, = struct.unpack('<I', data[0x18:0x1C])
+        if number_of_sections == 0:
+            return list()
+        # only the first section is parsed, a second section contains user defined properties
+        section_offset, = struct.unpack('<I', data[0x2C:0x30])
+        _, number_of_properties = struct.unpack('<II', data[section_offset:section_offset + 8])
+        properties = list()
+        for index in range(min(number_of_properties, 256)):
+            entry_offset = section_offset + 8 + index * 8
+            property_id, value_offset = struct.unpack('<II', data[entry_offset:entry_offset + 8])
+            properties.append((property_id, section_offset + value_offset))
+
+        code_page = 1252
+        for property_id, value_offset in properties:
+            if property_id == 1:
+                value = self.__parse_value(data=data, offset=value_offset, code_page=code_page)
+                if isinstance(value, int):
+                    code_page = value % 0x10000
+
+        metadata = list()
+        for property_id, value_offset in properties:
+            key = PROPERTY_NAMES[stream_name].get(property_id)
+            if key is None:
+                continue
+            value = self.__parse_value(data=data, offset=value_offset, code_page=code_page)
+            if value is None:
+                continue
+            if key == 'TotalTime' and isinstance(value, int):
+                value = str(value // 600000000)  # editing time is stored as duration in 100 ns, OOXML uses minutes
+            elif key == 'AppVersion' and isinstance(value, int):
+                value = '{0}.{1:04d}'.format(value >> 16, value & 0xFFFF)
+            elif isinstance(value, int) and key in ['lastPrinted', 'created', 'modified']:
+                if value == 0:
+                    continue
+                try:
+                    value = (FILETIME_EPOCH + timedelta(microseconds=value // 10)).strftime('%Y-%m-%dT%H:%M:%SZ')
+                except OverflowError:
+                    continue  # out of range timestamp
+            elif isinstance(value, bool):
+                value = str(value).lower()
+            metadata.append((key, str(value), description))
+        return metadata
+
+    def __parse_value(self, data, offset, code_page):
+        value_type, = struct.unpack('<H', data[offset:offset + 2])
+        offset += 4
+        if value_type == 0x02:  # VT_I2
+            return struct.unpack('<h', data[offset:offset + 2])[0]
+        if value_type == 0x03:  # VT_I4
+            return struct.unpack('<i', data[offset:offset + 4])[0]
+        if value_type == 0x13:  # VT_UI4
+            return struct.unpack('<I', data[offset:offset + 4])[0]
+        if value_type == 0x0B:  # VT_BOOL
+            return struct.unpack('<h', data[offset:offset + 2])[0] != 0
+        if value_type == 0x40:  # VT_FILETIME, returned as integer because it is also used for durations
+            return struct.unpack('<Q', data[offset:offset + 8])[0]
+        if value_type == 0x1E:  # VT_LPSTR
+            length, = struct.unpack('<I', data[offset:offset + 4])
+            return self.__decode_string(value=data[offset + 4:offset + 4 + length], code_page=code_page)
+        if value_type == 0x1F:  # VT_LPWSTR
+            length, = struct.unpack('<I', data[offset:offset + 4])
+            return data[offset + 4:offset + 4 + 2 * length].decode('utf-16-le', 'ignore').rstrip('\x00')
+        return None
+
+    @staticmethod
+    def __decode_string(value, code_page):
+        encoding = {1200: 'utf-16-le', 65001: 'utf-8', 10000: 'mac-roman'}.get(code_page, 'cp{}'.format(code_page))
+        try:
+            return value.decode(encoding, 'ignore').rstrip('\x00')
+        except LookupError:
+            return value.decode('latin-1').rstrip('\x00')
+
+
+ANALYSER = OLE_Analyser
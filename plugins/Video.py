@@ -0,0 +1,409 @@
+import re
+import struct
+from datetime import datetime, timedelta
+
+
+API_VERSION = 2
+
+# boxes and elements which are read into memory must not be larger than this,
+# media payloads (mdat, Matroska clusters) are never read but skipped by seeking
+MAX_READ_SIZE = 1024 * 1024
+
+MP4_EPOCH = datetime(1904, 1, 1)
+MATROSKA_EPOCH = datetime(2001, 1, 1)
+
+ISO_BMFF_TOP_LEVEL_BOXES = [b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot']
+
+# Matroska element IDs
+EBML_HEADER = 0x1A45DFA3
+EBML_DOC_TYPE = 0x4282
+MATROSKA_SEGMENT = 0x18538067
+MATROSKA_SEEK_HEAD = 0x114D9B74
+MATROSKA_SEEK = 0x4DBB
+MATROSKA_SEEK_ID = 0x53AB
+MATROSKA_SEEK_POSITION = 0x53AC
+MATROSKA_INFO = 0x1549A966
+MATROSKA_TAGS = 0x1254C367
+MATROSKA_TAG = 0x7373
+MATROSKA_SIMPLE_TAG = 0x67C8
+MATROSKA_TAG_NAME = 0x45A3
+MATROSKA_TAG_STRING = 0x4487
+MATROSKA_CLUSTER = 0x1F43B675
+
+MATROSKA_INFO_ELEMENTS = dict()
+MATROSKA_INFO_ELEMENTS[0x4461] = 'DateUTC'
+MATROSKA_INFO_ELEMENTS[0x7BA9] = 'Title'
+MATROSKA_INFO_ELEMENTS[0x4D80] = 'MuxingApp'
+MATROSKA_INFO_ELEMENTS[0x5741] = 'WritingApp'
+
+ISO_6709_PATTERN = re.compile(r'^([+-]\d{2}(?:\.\d+)?)([+-]\d{3}(?:\.\d+)?)([+-]\d+(?:\.\d+)?)?')
+
+
+KEY_TO_CATEGORIES = dict()
+# MP4 / QuickTime
+KEY_TO_CATEGORIES['mvhd:CreationTime'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['mvhd:ModificationTime'] = (['time', 'modify_time'], 1)
+KEY_TO_CATEGORIES['udta:©day'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['udta:©too'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['udta:©swr'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['udta:©mak'] = (['tool', 'hardware'], 1)
+KEY_TO_CATEGORIES['udta:©mod'] = (['tool', 'hardware'], 1)
+KEY_TO_CATEGORIES['udta:©ART'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['udta:©aut'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['udta:©cmt'] = (['author', 'comment'], 1)
+KEY_TO_CATEGORIES['udta:©xyz'] = (['location'], 2)
+KEY_TO_CATEGORIES['com.apple.quicktime.creationdate'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.make'] = (['tool', 'hardware'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.model'] = (['tool', 'hardware'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.software'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.author'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.comment'] = (['author', 'comment'], 1)
+KEY_TO_CATEGORIES['com.apple.quicktime.location.ISO6709'] = (['location'], 2)
+KEY_TO_CATEGORIES['com.android.version'] = (['tool', 'software'], 1)
+
+# Matroska / WebM
+KEY_TO_CATEGORIES['Info:DateUTC'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['Info:MuxingApp'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['Info:WritingApp'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['Tag:DATE_RECORDED'] = (['time', 'creation_time'], 1)
+KEY_TO_CATEGORIES['Tag:DATE_ENCODED'] = (['time'], 1)
+KEY_TO_CATEGORIES['Tag:ENCODER'] = (['tool', 'software'], 1)
+KEY_TO_CATEGORIES['Tag:ARTIST'] = (['author', 'author_name'], 1)
+KEY_TO_CATEGORIES['Tag:COMMENT'] = (['author', 'comment'], 1)
+
+KEY_TO_CATEGORIES['Location => Latitude'] = (['location', 'position_latitude'], 1)
+KEY_TO_CATEGORIES['Location => Longitude'] = (['location', 'position_longitude'], 1)
+KEY_TO_CATEGORIES['Location => Altitude'] = (['location'], 1)
+
+
+def iterate_boxes_in_file(file_stream, start, end):
+    """
+    yields (box type, payload offset, payload size) of the ISO base media boxes between start and end,
+    the payloads are not read
+    """
+    offset = start
+    while offset + 8 <= end:
+        file_stream.seek(offset)
+        header = file_stream.read(16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, min(size, end - offset) - header_size
+        offset += size
+
+
+def iterate_boxes(data):
+    """
+    yields (box type, payload) of the ISO base media boxes contained in data
+    """
+    offset = 0
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+        if size == 0:
+            size = len(data) - offset
+        if size < 8:
+            return
+        yield box_type, data[offset + 8:offset + size]
+        offset += size
+
+
+class Video_Analyser:
+    """
+    Reads the metadata of MP4/MOV (ISO base media file format) and Matroska/WebM containers.
+    Only the headers are parsed, the media data is skipped by seeking.
+    """
+    def name(self):
+        return 'Video'
+
+    def capabilities(self):
+        categories = set()
+        for category, _ in KEY_TO_CATEGORIES.values():
+            categories.update(category)
+        types = ['.mp4', '.m4v', '.m4a', '.mov', '.qt', '.3gp', '.3g2', '.mkv', '.mka', '.webm']
+        return {'types': types, 'categories': sorted(categories), 'cost': 1}
+
+    def extract_metadata(self, path_to_file: str) -> dict:
+        metadata = self.__extract_metadata(path_to_file=path_to_file)
+        metadata = self.__enrich_with_location(metadata=metadata)
+        metadata = self.__enrich_with_categories(metadata=metadata)
+        return metadata
+
+    def __enrich_with_categories(self, metadata: dict) -> dict:
+        enriched_metadata = list()
+        for key, value, describtion in metadata:
+            category, vlevel = KEY_TO_CATEGORIES.get(key, (list(), 3))
+            enriched_metadata.append((key, value, describtion, category, vlevel))
+        return enriched_metadata
+
+    def __extract_metadata(self, path_to_file):
+        try:
+            with open(path_to_file, mode='rb') as file_stream:
+                file_stream.seek(0, 2)
+                file_size = file_stream.tell()
+                file_stream.seek(0)
+                signature = file_stream.read(8)
+                if len(signature) < 8:
+                    return list()
+                if struct.unpack('>I', signature[:4])[0] == EBML_HEADER:
+                    return self.__extract_matroska_metadata(file_stream=file_stream, file_size=file_size)
+                if signature[4:8] in ISO_BMFF_TOP_LEVEL_BOXES:
+                    return self.__extract_iso_bmff_metadata(file_stream=file_stream, file_size=file_size)
+                return list()
+        except (OSError, struct.error, ValueError, IndexError, OverflowError):
+            return list()
+
+    ##############################################################################################
+    # MP4 / MOV
+
+    def __extract_iso_bmff_metadata(self, file_stream, file_size):
+        for box_type, payload_offset, payload_size in iterate_boxes_in_file(file_stream, 0, file_size):
+            if box_type == b'moov':
+                return self.__parse_moov(file_stream=file_stream, offset=payload_offset, size=payload_size)
+        return list()
+
+    def __parse_moov(self, file_stream, offset, size):
+        metadata = list()
+        for box_type, payload_offset, payload_size in iterate_boxes_in_file(file_stream, offset, offset + size):
+            if box_type not in [b'mvhd', b'udta', b'meta'] or payload_size > MAX_READ_SIZE:
+                continue  # trak boxes contain the large sample tables and are skipped
+            file_stream.seek(payload_offset)
+            payload = file_stream.read(payload_size)
+            if box_type == b'mvhd':
+                metadata += self.__parse_mvhd(payload=payload)
+            elif box_type == b'udta':
+                metadata += self.__parse_udta(payload=payload)
+            else:
+                metadata += self.__parse_meta(payload=payload)
+        return metadata
+
+    def __parse_mvhd(self, payload):
+        metadata = list()
+        if payload[0] == 1:
+            creation_time, modification_time = struct.unpack('>QQ', payload[4:20])
+        else:
+            creation_time, modification_time = struct.unpack('>II', payload[4:12])
+        for key, seconds in [('mvhd:CreationTime', creation_time), ('mvhd:ModificationTime', modification_time)]:
+            if seconds > 0:
+                try:
+                    timestamp = MP4_EPOCH + timedelta(seconds=seconds)
+                except OverflowError:
+                    continue  # corrupt timestamp
+                metadata.append((key, timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'), 'embedded MP4/MOV metadata'))
+        return metadata
+
+    def __parse_udta(self, payload):
+        metadata = list()
+        for box_type, data in iterate_boxes(payload):
+            if box_type == b'meta':
+                metadata += self.__parse_meta(payload=data)
+            elif box_type[0] == 0xA9 and len(data) >= 4:
+                # QuickTime user data text: 16 bit length, 16 bit language code, text
+                length = struct.unpack('>H', data[:2])[0]
+                value = data[4:4 + length].decode('utf-8', 'ignore')
+                metadata.append(('udta:' + box_type.decode('latin-1'), value, 'embedded MP4/MOV metadata'))
+        return metadata
+
+    def __parse_meta(self, payload):
+        # in MP4 files meta is a full box (with version and flags), in QuickTime files it is not
+        if payload[4:8] not in [b'hdlr', b'keys', b'ilst']:
+            payload = payload[4:]
+        keys = list()
+        metadata = list()
+        for box_type, data in iterate_boxes(payload):
+            if box_type == b'keys':
+                keys = self.__parse_keys(payload=data)
+            elif box_type == b'ilst':
+                for item_type, item in iterate_boxes(data):
+                    value = self.__parse_ilst_item(payload=item)
+                    if value is None:
+                        continue
+                    index = struct.unpack('>I', item_type)[0]
+                    if 0 < index <= len(keys):
+                        key = keys[index - 1]
+                    else:
+                        key = 'udta:' + item_type.decode('latin-1')
+                    metadata.append((key, value, 'embedded MP4/MOV metadata'))
+        return metadata
+
+    def __parse_keys(self, payload):
+        keys = list()
+        for _, data in iterate_boxes(payload[8:]):  # skip version, flags and entry count
+            keys.append(data.decode('utf-8', 'ignore'))
+        return keys
+
+    def __parse_ilst_item(self, payload):
+        for box_type, data in iterate_boxes(payload):
+            if box_type != b'data' or len(data) < 8:
+                continue
+            type_indicator = struct.unpack('>I', data[:4])[0] & 0xFFFFFF
+            if type_indicator == 1:
+                return data[8:].decode('utf-8', 'ignore')
+            if type_indicator == 2:
+                return data[8:].decode('utf-16-be', 'ignore')
+        return None
+
+    ##############################################################################################
+    # Matroska / WebM
+
+    def __extract_matroska_metadata(self, file_stream, file_size):
+        element_id, data_offset, data_size = self.__read_element_header(file_stream=file_stream, offset=0)
+        if data_size is None:
+            return list()
+        file_stream.seek(data_offset)
+        ebml_header = file_stream.read(min(data_size, MAX_READ_SIZE))
+        doc_types = [data for element, data in self.__iterate_elements(ebml_header) if element == EBML_DOC_TYPE]
+        if len(doc_types) == 0 or doc_types[0].rstrip(b'\x00') not in [b'matroska', b'webm']:
+            return list()
+
+        element_id, segment_offset, segment_size = self.__read_element_header(file_stream=file_stream, offset=data_offset + data_size)
+        if element_id != MATROSKA_SEGMENT:
+            return list()
+        segment_end = file_size if segment_size is None else min(file_size, segment_offset + segment_size)
+
+        # walk the top level elements of the segment until the first cluster
+        elements = dict()
+        offset = segment_offset
+        while offset < segment_end:
+            element_id, data_offset, data_size = self.__read_element_header(file_stream=file_stream, offset=offset)
+            if element_id == MATROSKA_CLUSTER or data_size is None:
+                break
+            if element_id in [MATROSKA_SEEK_HEAD, MATROSKA_INFO, MATROSKA_TAGS] and element_id not in elements:
+                elements[element_id] = (data_offset, data_size)
+            offset = data_offset + data_size
+
+        # the tags are often stored behind the clusters, their position can be found in the seek head
+        if MATROSKA_SEEK_HEAD in elements:
+            for element_id, position in self.__parse_seek_head(file_stream, *elements[MATROSKA_SEEK_HEAD]):
+                if element_id in [MATROSKA_INFO, MATROSKA_TAGS] and element_id not in elements:
+                    found_id, data_offset, data_size = self.__read_element_header(file_stream=file_stream, offset=segment_offset + position)
+                    if found_id == element_id and data_size is not None:
+                        elements[element_id] = (data_offset, data_size)
+
+        metadata = list()
+        if MATROSKA_INFO in elements:
+            metadata += self.__parse_info(data=self.__read_element_data(file_stream, *elements[MATROSKA_INFO]))
+        if MATROSKA_TAGS in elements:
+            metadata += self.__parse_tags(data=self.__read_element_data(file_stream, *elements[MATROSKA_TAGS]))
+        return metadata
+
+    def __parse_seek_head(self, file_stream, data_offset, data_size):
+        positions = list()
+        for element_id, seek in self.__iterate_elements(self.__read_element_data(file_stream, data_offset, data_size)):
+            if element_id != MATROSKA_SEEK:
+                continue
+            seek_id = None
+            seek_position = None
+            for child_id, data in self.__iterate_elements(seek):
+                if child_id == MATROSKA_SEEK_ID:
+                    seek_id = int.from_bytes(data, 'big')
+                elif child_id == MATROSKA_SEEK_POSITION:
+                    seek_position = int.from_bytes(data, 'big')
+            if seek_id is not None and seek_position is not None:
+                positions.append((seek_id, seek_position))
+        return positions
+
+    def __parse_info(self, data):
+        metadata = list()
+        for element_id, value in self.__iterate_elements(data):
+            if element_id not in MATROSKA_INFO_ELEMENTS:
+                continue
+            key = 'Info:' + MATROSKA_INFO_ELEMENTS[element_id]
+            if element_id == 0x4461:
+                nanoseconds = int.from_bytes(value, 'big', signed=True)
+                timestamp = MATROSKA_EPOCH + timedelta(microseconds=nanoseconds // 1000)
+                metadata.append((key, timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'), 'embedded Matroska metadata'))
+            else:
+                metadata.append((key, value.decode('utf-8', 'ignore').rstrip('\x00'), 'embedded Matroska metadata'))
+        return metadata
+
+    def __parse_tags(self, data):
+        metadata = list()
+        for element_id, tag in self.__iterate_elements(data):
+            if element_id != MATROSKA_TAG:
+                continue
+            for child_id, simple_tag in self.__iterate_elements(tag):
+                if child_id == MATROSKA_SIMPLE_TAG:
+                    metadata += self.__parse_simple_tag(data=simple_tag)
+        return metadata
+
+    def __parse_simple_tag(self, data):
+        metadata = list()
+        tag_name = None
+        tag_string = None
+        for element_id, value in self.__iterate_elements(data):
+            if element_id == MATROSKA_TAG_NAME:
+                tag_name = value.decode('utf-8', 'ignore').rstrip('\x00')
+            elif element_id == MATROSKA_TAG_STRING:
+                tag_string = value.decode('utf-8', 'ignore').rstrip('\x00')
+            elif element_id == MATROSKA_SIMPLE_TAG:
+                metadata += self.__parse_simple_tag(data=value)
+        if tag_name is not None and tag_string is not None:
+            metadata.insert(0, ('Tag:' + tag_name, tag_string, 'embedded Matroska metadata'))
+        return metadata
+
+    def __read_element_header(self, file_stream, offset):
+        file_stream.seek(offset)
+        header = file_stream.read(12)
+        element_id, id_length = self.__read_vint(header, 0, keep_marker=True)
+        data_size, size_length = self.__read_vint(header, id_length, keep_marker=False)
+        if data_size == (1 << (7 * size_length)) - 1:
+            data_size = None  # unknown size
+        return element_id, offset + id_length + size_length, data_size
+
+    @staticmethod
+    def __read_element_data(file_stream, data_offset, data_size):
+        if data_size > MAX_READ_SIZE:
+            return b''
+        file_stream.seek(data_offset)
+        return file_stream.read(data_size)
+
+    def __iterate_elements(self, data):
+        offset = 0
+        while offset < len(data):
+            element_id, id_length = self.__read_vint(data, offset, keep_marker=True)
+            data_size, size_length = self.__read_vint(data, offset + id_length, keep_marker=False)
+            start = offset + id_length + size_length
+            yield element_id, data[start:start + data_size]
+            offset = start + data_size
+
+    @staticmethod
+    def __read_vint(data, offset, keep_marker):
+        if offset >= len(data) or data[offset] == 0:
+            raise ValueError('invalid EBML variable size integer')
+        length = 8 - data[offset].bit_length() + 1
+        value = int.from_bytes(data[offset:offset + length], 'big')
+        if not keep_marker:
+            value &= (1 << (7 * length)) - 1
+        return value, length
+
+    ##############################################################################################
+    # location
+
+    def __enrich_with_location(self, metadata: list):
+        for key, value, _ in list(metadata):
+            if key not in ['udta:©xyz', 'com.apple.quicktime.location.ISO6709']:
+                continue
+            match = ISO_6709_PATTERN.match(value.strip())
+            if match is None:
+                continue
+            lat = float(match.group(1))
+            lon = float(match.group(2))
+            metadata.append(('Location => Latitude', '{0} {1}'.format(abs(lat), 'N' if lat >= 0 else 'S'), 'extracted from ISO 6709 location'))
+            metadata.append(('Location => Longitude', '{0} {1}'.format(abs(lon), 'E' if lon >= 0 else 'W'), 'extracted from ISO 6709 location'))
+            if match.group(3) is not None:
+                metadata.append(('Location => Altitude', '{0} meter'.format(float(match.group(3))), 'extracted from ISO 6709 location'))
+            break
+        return metadata
+
+
+ANALYSER = Video_Analyser
@@ -1,5 +1,10 @@
 import os
-from libxmp.utils import file_to_dict       # Does not work on windows machine
+import libxmp
+from libxmp import XMPFiles, XMPMeta, XMPError
+from libxmp.utils import object_to_dict     # Does not work on windows machine
+
+
+API_VERSION = 2
 
 
 KEY_TO_CATEGORIES = dict()
@@ -54,15 +59,54 @@ KEY_TO_CATEGORIES['photoshop:Source'] = (['author'], 1)
 
 
 class XMP_Analyser:
+    def __init__(self):
+        self.xmp_file = None
+        self.is_set_up = False
+
     def name(self):
         return 'XMP'
 
+    def capabilities(self):
+        categories = set()
+        for category, _ in KEY_TO_CATEGORIES.values():
+            categories.update(category)
+        return {'types': None, 'categories': sorted(categories), 'cost': 2}
+
+    def setup(self):
+        # one XMPFiles handle is reused for all files instead of creating one per file
+        self.is_set_up = True
+        if os.name != 'nt':
+            try:
+                self.xmp_file = XMPFiles()
+            except libxmp.ExempiLoadError:
+                self.xmp_file = None    # the Exempi library is not installed
+
+    def teardown(self):
+        self.xmp_file = None
+        self.is_set_up = False
+
     def extract_metadata(self, path_to_file: str) -> dict:
         if os.name == 'nt':  
             return list()
+        if not self.is_set_up:
+            self.setup()
+        if self.xmp_file is None:
+            return list()
         metadata = self.__extract_metadata(path_to_file=path_to_file)
         metadata = self.__enrich_with_categories(metadata=metadata)
         return metadata
+
+    def decode_xmp(self, xmp_packet: str, description='embedded XMP metadata') -> list:
+        """
+        parses a serialized XMP packet and maps its properties onto the categories
+        """
+        try:
+            xmp_meta_data = object_to_dict(XMPMeta(xmp_str=xmp_packet))
+        except (XMPError, libxmp.ExempiLoadError):
+            return list()
+        metadata = self.__flatten(xmp_meta_data=xmp_meta_data, description=description)
+        metadata = self.__enrich_with_categories(metadata=metadata)
+        return metadata
     
     def __enrich_with_categories(self, metadata: dict) -> dict:
         enriched_metadata = list()
@@ -73,14 +117,30 @@ class XMP_Analyser:
 
     def __extract_metadata(self, path_to_file):
         try:
-            xmp_meta_data = file_to_dict(path_to_file)
-            meta_data_entries = list()
-            for level_1_key in xmp_meta_data.keys():
-                for key, value, parameters in xmp_meta_data[level_1_key]:
-                    meta_data_entries.append((key, value, 'embedded XMP metadata'))
-            return meta_data_entries
-        except libxmp.ExempliLoadError:
+            xmp_meta_data = self.__read_xmp(path_to_file=path_to_file)
+            return self.__flatten(xmp_meta_data=xmp_meta_data, description='embedded XMP metadata')
+        except libxmp.ExempiLoadError:
             return list()
 
+    def __flatten(self, xmp_meta_data: dict, description: str):
+        meta_data_entries = list()
+        for level_1_key in xmp_meta_data.keys():
+            for key, value, parameters in xmp_meta_data[level_1_key]:
+                meta_data_entries.append((key, value, description))
+        return meta_data_entries
+
+    def __read_xmp(self, path_to_file):
+        try:
+            self.xmp_file.open_file(path_to_file, open_onlyxmp=True)
+        except XMPError:
+            return dict()
+        try:
+            xmp = self.xmp_file.get_xmp()
+        finally:
+            self.xmp_file.close_file()
+        if xmp is None:
+            return dict()
+        return object_to_dict(xmp)
+
 
 ANALYSER = XMP_Analyser
\ No newline at end of file
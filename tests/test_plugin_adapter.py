@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import metadump
+from metadump import PluginAdapter
+
+
+class Recording_Analyser:
+    """
+    Plugin with API version 2 which records how it is called by metadump
+    """
+    def __init__(self, name, types=None, replaces=None, batching=False, unknown_paths=None):
+        self.plugin_name = name
+        self.types = types
+        self.replaces = replaces or list()
+        self.unknown_paths = unknown_paths or list()
+        self.calls = list()
+        if batching:
+            self.extract_many = self.__extract_many
+
+    def name(self):
+        return self.plugin_name
+
+    def capabilities(self):
+        return {'types': self.types, 'replaces': self.replaces, 'categories': ['author'], 'cost': 1}
+
+    def setup(self):
+        self.calls.append('setup')
+
+    def teardown(self):
+        self.calls.append('teardown')
+
+    def extract_metadata(self, path_to_file):
+        self.calls.append(('extract_metadata', path_to_file))
+        return [(self.plugin_name, path_to_file, 'description', ['author'], 1)]
+
+    def __extract_many(self, paths_to_files):
+        self.calls.append(('extract_many', list(paths_to_files)))
+        results = [(x, [(self.plugin_name, x, 'description', ['author'], 1)]) for x in paths_to_files]
+        return results + [(x, list()) for x in self.unknown_paths]
+
+
+def extract(plugins, file_paths, specified_plugins=None, batch_size=2):
+    with mock.patch.object(metadump, 'PLUGINS', plugins):
+        return list(metadump.extract_metadata_of_files(file_paths=file_paths, specified_plugins=specified_plugins, batch_size=batch_size))
+
+
+class PluginAdapterTest(unittest.TestCase):
+    def test_setup_is_called_once_and_teardown_after_the_last_file(self):
+        plugin = Recording_Analyser(name='A')
+        adapter = PluginAdapter(plugin=plugin, api_version=2)
+        extract(plugins=[adapter], file_paths=['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual(plugin.calls.count('setup'), 1)
+        self.assertNotIn('teardown', plugin.calls)
+        adapter.teardown()
+        adapter.teardown()
+        self.assertEqual(plugin.calls[-1], 'teardown')
+        self.assertEqual(plugin.calls.count('teardown'), 1)
+
+    def test_files_are_routed_by_types_and_replaces(self):
+        png_plugin = Recording_Analyser(name='PNG', types=['.PNG'], replaces=['Other'])
+        other_plugin = Recording_Analyser(name='Other')
+        plugins = [PluginAdapter(plugin=png_plugin, api_version=2), PluginAdapter(plugin=other_plugin, api_version=2)]
+        results = extract(plugins=plugins, file_paths=['a.png', 'b.jpg'])
+        self.assertEqual([(x, [y[0] for y in metadata]) for x, metadata in results], [('a.png', ['PNG']), ('b.jpg', ['Other'])])
+        with mock.patch.object(metadump, 'PLUGINS', plugins):
+            self.assertEqual([x[0] for x in metadump.extract_metadata_of_file('a.png')], ['PNG'])
+
+    def test_replaced_plugins_are_used_if_the_replacing_plugin_is_not_selected(self):
+        png_plugin = Recording_Analyser(name='PNG', types=['.png'], replaces=['Other'])
+        other_plugin = Recording_Analyser(name='Other')
+        plugins = [PluginAdapter(plugin=png_plugin, api_version=2), PluginAdapter(plugin=other_plugin, api_version=2)]
+        results = extract(plugins=plugins, file_paths=['a.png'], specified_plugins=['Other'])
+        self.assertEqual([y[0] for y in results[0][1]], ['Other'])
+
+    def test_extract_many_gets_the_files_in_batches(self):
+        plugin = Recording_Analyser(name='A', batching=True)
+        results = extract(plugins=[PluginAdapter(plugin=plugin, api_version=2)], file_paths=['a', 'b', 'c'])
+        self.assertEqual([x for x in plugin.calls if x != 'setup'], [('extract_many', ['a', 'b']), ('extract_many', ['c'])])
+        self.assertEqual([x for x, _ in results], ['a', 'b', 'c'])
+
+    def test_unknown_paths_of_extract_many_are_ignored(self):
+        plugin = Recording_Analyser(name='A', batching=True, unknown_paths=['unknown'])
+        with mock.patch('builtins.print'):
+            results = extract(plugins=[PluginAdapter(plugin=plugin, api_version=2)], file_paths=['a', 'b'])
+        self.assertEqual([(x, len(metadata)) for x, metadata in results], [('a', 1), ('b', 1)])
+
+    def test_plugins_with_api_version_1_only_get_single_files(self):
+        plugin = Recording_Analyser(name='A', types=['.pdf'], batching=True)
+        adapter = PluginAdapter(plugin=plugin, api_version=1)
+        extract(plugins=[adapter], file_paths=['a.jpg', 'b.jpg'])
+        adapter.teardown()
+        self.assertEqual(plugin.calls, [('extract_metadata', 'a.jpg'), ('extract_metadata', 'b.jpg')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from metadump import parse_predicate, matches_predicates
+
+
+def matches(metadata, *expressions):
+    return matches_predicates(metadata=metadata, predicates=[parse_predicate(x) for x in expressions])
+
+
+POSITION = [
+    ('GPSInfo => Latitude', '5.1 N', '', ['location', 'position_latitude'], 1),
+    ('GPSInfo => Longitude', '2.0 W', '', ['location', 'position_longitude'], 1),
+]
+
+
+class PredicateTest(unittest.TestCase):
+    def test_gps_coordinates_are_compared_as_signed_numbers(self):
+        self.assertFalse(matches(POSITION, 'position_latitude>=40'))
+        self.assertTrue(matches(POSITION, 'position_latitude<10'))
+        self.assertFalse(matches(POSITION, 'position_longitude>0'))
+        self.assertTrue(matches(POSITION, 'position_longitude<=-2'))
+        self.assertTrue(matches(POSITION, 'position_latitude>=5 N'))
+        self.assertTrue(matches(POSITION, 'location within 0,-5,10,0'))
+        self.assertIsNone(parse_predicate('position_latitude>north'))
+
+    def test_timestamps_of_the_plugins_are_parsed(self):
+        for value in ["D:20220101120000+01'00'", 'D:20220101120000Z00\'00\'', '2022-01-01T12:00:00+01:00', '2022-01-01T12:00:00+0100',
+                      '2022-01-01T12:00:00.123Z', '2022:01:01 12:00:00', '2022-01-01 12:00:00', '2022-01-01T12:00:00Z']:
+            metadata = [('date', value, '', ['time', 'creation_time'], 1)]
+            self.assertTrue(matches(metadata, 'creation_time>=2021-01-01'), value)
+            self.assertTrue(matches(metadata, 'creation_time=2022-01-01'), value)
+            self.assertTrue(matches(metadata, 'creation_time<2022-01-01T12:00:01'), value)
+
+    def test_time_is_compared_as_date(self):
+        metadata = [('DateTime', '2021:03:04 10:00:00', '', ['time', 'modify_time'], 1)]
+        self.assertFalse(matches(metadata, 'time>=2021-06-01'))
+        self.assertTrue(matches(metadata, 'time<2021-06-01'))
+        self.assertTrue(matches(metadata, 'time=2021-03-04'))
+
+    def test_any_value_of_the_category_can_match(self):
+        metadata = [('created', '2019-01-01T00:00:00Z', '', ['time', 'creation_time'], 1),
+                    ('DateTimeOriginal', '2021:05:01 00:00:00', '', ['time', 'creation_time'], 1),
+                    ('Comment', 'not a date', '', ['time'], 1)]
+        self.assertTrue(matches(metadata, 'creation_time>=2021-01-01'))
+        self.assertFalse(matches(metadata, 'time>2022-01-01'))
+
+
+if __name__ == '__main__':
+    unittest.main()